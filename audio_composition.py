@@ -1,10 +1,51 @@
 from abc import abstractmethod
 from scipy.io import wavfile
+from scipy import signal
+from functools import lru_cache
+from math import gcd
+from concurrent.futures import ThreadPoolExecutor
 import bisect
+import os
 from typing import Union, List
 import numpy as np
 from pathlib import Path
-from utils import stereo_to_mono
+
+try:
+    from numba import njit
+except ImportError: # numba is optional, mixing falls back to plain NumPy
+    njit = None
+
+
+@lru_cache(maxsize=None)
+def _resample_taps(up: int, down: int, beta: float = 5.0) -> np.ndarray:
+    """Design the low-pass FIR filter resample_poly uses by default, once per (up, down) ratio."""
+    max_rate = max(up, down)
+    taps = signal.firwin(2 * 10 * max_rate + 1, 1. / max_rate, window=('kaiser', beta)).astype(np.float32)
+    taps.setflags(write=False)
+    return taps
+
+
+_TIME_CACHE = {} # per sr, the longest time grid requested so far
+
+
+def time_grid(n: int, sr: int) -> np.ndarray:
+    """Get the times (in seconds) of the first n samples at a given sample rate.
+
+    One grid is kept per sample rate and shorter requests are served as slices of it.
+
+    Parameters:
+        n: The number of samples.
+        sr: The sample rate (in samples per second).
+
+    Returns:
+        A read-only NumPy array of length n.
+    """
+    arr = _TIME_CACHE.get(sr)
+    if arr is None or arr.size < n:
+        arr = np.arange(max(n, 65536), dtype=np.float32) / np.float32(sr)
+        arr.setflags(write=False)
+        _TIME_CACHE[sr] = arr
+    return arr[:n]
 
 
 #TODO NOTE TIME WRAP.
@@ -27,26 +68,71 @@ class SoundGenerator:
     
 
 class AudioSample(SoundGenerator):
-    def __init__(self, data: np.ndarray, sr: int = 44100, to_mono: bool = True, name: str = None, filepath: Path = None):
+    def __init__(self, data: np.ndarray, sr: int = 44100, to_mono: bool = True, name: str = None, filepath: Path = None, lazy: bool = False):
         """Create an audio sample from a NumPy array.
         
         Parameters:
-            data: The audio data as a NumPy array.
+            data: The audio data as a NumPy array. WAV PCM data (uint8, int16, int32) is scaled to float32 in [-1, 1], anything else is converted to float32 as is.
             sr: The sample rate of the audio data (in samples per second).
             to_mono: If True, the audio data will be converted to mono.
             name: An optional name for the audio sample.
+            lazy: If True, the audio data (e.g. a memory mapped file) is converted on first access instead of here.
         """
         if isinstance(data, list):
-            data = np.array(data)
-        
-        if to_mono:
-            data = stereo_to_mono(data)
+            data = np.asarray(data, dtype=np.float32)
         
-        self.data = np.array(data)
+        self._raw = data
+        self._data = None
         self.sr = sr
         self.to_mono = to_mono
         self.name = name
+        self._resample_cache = {} #keeps data already resampled, keyed by sr
         # self._typecheck(data)
+
+        if not lazy:
+            self._load()
+
+    @property
+    def data(self) -> np.ndarray:
+        """The audio data as a float32 NumPy array."""
+        if self._data is None:
+            self._load()
+        return self._data
+
+    @data.setter
+    def data(self, data: np.ndarray):
+        self._data = data
+        self._raw = None
+        self._resample_cache = {}
+
+    def _load(self):
+        """Convert the raw audio data into the float32 array kept in self.data."""
+        data = self._raw
+
+        # Samples are kept as float32 in [-1, 1], so mixing never upcasts.
+        # Converting before the mono mix keeps that in float32 too.
+        if data.dtype == np.uint8:
+            # 8-bit WAV data is unsigned, centred on 128
+            data = data.astype(np.float32) / np.float32(128) - 1
+        elif data.dtype in (np.int16, np.int32):
+            data = data.astype(np.float32) / np.float32(-np.iinfo(data.dtype).min)
+        elif isinstance(data, np.memmap):
+            # Copy out of the file so dropping _raw releases the mapping
+            data = np.array(data, dtype=np.float32)
+        else:
+            data = np.ascontiguousarray(data, dtype=np.float32)
+
+        # Mono data needs no extra pass, a single channel column is just dropped.
+        if self.to_mono and data.ndim == 2:
+            if data.shape[1] == 1:
+                data = data[:, 0]
+            elif data.shape[1] == 2:
+                data = 0.5 * (data[:, 0] + data[:, 1])
+            else:
+                data = data.mean(axis=1, dtype=np.float32)
+        
+        self._data = data
+        self._raw = None
     
     @classmethod
     def from_file(cls, wav_path: str, to_mono: bool = True) -> 'AudioSample':
@@ -57,15 +143,19 @@ class AudioSample(SoundGenerator):
             to_mono: If True, the audio data will be converted to mono.
         
         Returns:
-            An AudioSample object.
+            An AudioSample object. The file is memory mapped and only converted when its data is first used.
         """
         wav_path = Path(wav_path)
-        samplerate, data = wavfile.read(wav_path)
-        return cls(data, samplerate, to_mono=to_mono, name=wav_path.name, filepath=wav_path)
+        try:
+            samplerate, data = wavfile.read(wav_path, mmap=True)
+        except ValueError:
+            # Formats such as 24-bit PCM can't be memory mapped
+            samplerate, data = wavfile.read(wav_path)
+        return cls(data, samplerate, to_mono=to_mono, name=wav_path.name, filepath=wav_path, lazy=True)
 
     def _typecheck(self, data):
-        # This is temporary check. Porobaly will be made of Float64 or smth like this.
-        assert all(map(lambda x: isinstance(x, [int, float]) , data))
+        # Checks the dtype only, so it takes constant time regardless of sample length.
+        assert np.issubdtype(data.dtype, np.number), f"expected numeric dtype, got {data.dtype}"
 
     def get_sound(self, sr: Union[int, None] = None) -> np.ndarray:
         """Generate an audio sound from the audio sample.
@@ -77,8 +167,15 @@ class AudioSample(SoundGenerator):
             A NumPy array containing the audio data for the generated sound.
         """
         sr = self.sr if sr is None else sr
-        #add resample here
-        return self.data
+        if sr == self.sr:
+            return self.data
+
+        if sr not in self._resample_cache:
+            g = gcd(sr, self.sr)
+            up, down = sr // g, self.sr // g
+            sound = signal.resample_poly(self.data, up, down, window=_resample_taps(up, down))
+            self._resample_cache[sr] = sound.astype(np.float32, copy=False)
+        return self._resample_cache[sr]
 
     
 class AudioSynthesizer(SoundGenerator):
@@ -129,6 +226,7 @@ class Wavetable(dict):
         self.sr = sr
 
         self.wavetable = {} #keeps data already sampled in sr
+        self._scaled = {} #keeps velocity scaled data, keyed by (k, velocity)
     
     def __getitem__(self, k: Union[int, str]) -> np.ndarray:
         """Get the audio data for a given note from the wavetable.
@@ -142,6 +240,32 @@ class Wavetable(dict):
         if k not in self.wavetable:
             self.wavetable[k] = self.get_sound(k)
         return self.wavetable[k]
+
+    def get_scaled(self, k: Union[int, str], velocity: float) -> np.ndarray:
+        """Get the audio data for a given note scaled by velocity.
+
+        Scaled sounds are cached, so repeated (note, velocity) pairs are computed only once. This serves direct Instrument.play_note callers.
+        Timeline.generate_audio scales while mixing instead.
+        The returned array is read-only.
+
+        Parameters:
+            k: The note to get the audio data for. This can be an integer (e.g. middle C is represented as 60) or a string (e.g. "C4").
+            velocity: The velocity of the note (a value between 0 and 1).
+
+        Returns:
+            A read-only NumPy array containing the scaled audio data for the given note.
+        """
+        if velocity == 1.0:
+            sound = self[k].view()
+            sound.setflags(write=False)
+            return sound
+
+        key = (k, velocity)
+        if key not in self._scaled:
+            sound = (self[k] * velocity).astype(np.float32, copy=False)
+            sound.setflags(write=False)
+            self._scaled[key] = sound
+        return self._scaled[key]
     
     def get_sound(self, k: Union[int, str]) -> np.ndarray:
         """Generate an audio sound for a given note using the sound generator.
@@ -158,6 +282,32 @@ class Wavetable(dict):
         return self.sound_generator.get_sound(self.sr)
 
 
+class WavetableArena:
+    def __init__(self, sounds: dict):
+        """Pack sounds into one contiguous float32 array.
+        
+        Parameters:
+            sounds: A mapping from a key to the audio data stored under it.
+        """
+        total = sum(sound.shape[0] for sound in sounds.values())
+        self.arena = np.empty(total, dtype=np.float32)
+        self.slots = {} #keeps the slice of the arena holding each key
+
+        offset = 0
+        for key, sound in sounds.items():
+            end = offset + sound.shape[0]
+            self.arena[offset:end] = sound
+            self.slots[key] = slice(offset, end)
+            offset = end
+
+    def __getitem__(self, key) -> np.ndarray:
+        """Get the audio data stored under a key, as a view into the arena."""
+        return self.arena[self.slots[key]]
+
+    def __contains__(self, key) -> bool:
+        return key in self.slots
+
+
 class Instrument:
     def __init__(self, wavetable: Wavetable):
         """Create an instrument from a wavetable.
@@ -179,10 +329,12 @@ class Instrument:
         
         Returns:
             A NumPy array containing the audio data for the generated sound.
+
+        Timeline.generate_audio does not call this method, it mixes straight from the wavetables.
         """
-        sound = self.wavetable[note.note] * note.velocity
+        sound = self.wavetable.get_scaled(note.note, note.velocity)
         sr = self.wavetable.sr
-        ### Add param automation handling here.
+        ### Param automation belongs in Timeline.generate_audio, sounds rendered there never pass through here.
 
         if note.time_wise:
             sound = sound[:int(note.duration * sr)]
@@ -201,9 +353,85 @@ class Track:
         self.id = track_id
         self.instrument = instrument
 
+def _mix_numpy(out: np.ndarray, flat_samples: np.ndarray, offsets: np.ndarray, lengths: np.ndarray, start_idx: np.ndarray, velocities: np.ndarray,
+               sparse: bool):
+    # Fallback for _mix when numba is not installed
+    scratch = np.empty(lengths.max() if lengths.size else 0, dtype=out.dtype)
+    high_water = 0
+    for o, l, s, v in zip(offsets.tolist(), lengths.tolist(), start_idx.tolist(), velocities.tolist()):
+        if sparse:
+            first_touch = s >= high_water
+            high_water = max(high_water, s + l)
+            if first_touch:
+                np.multiply(flat_samples[o:o + l], v, out=out[s:s + l])
+                continue
+        buf = scratch[:l]
+        np.multiply(flat_samples[o:o + l], v, out=buf)
+        out[s:s + l] += buf
+
+
+def _mix_loop(out: np.ndarray, flat_samples: np.ndarray, offsets: np.ndarray, lengths: np.ndarray, start_idx: np.ndarray, velocities: np.ndarray,
+              sparse: bool):
+    # Notes may overlap in out, so they are mixed one after another (no prange).
+    # Indexing per note views from 0 lets LLVM vectorize the inner loops.
+    high_water = 0
+    for i in range(start_idx.shape[0]):
+        s = start_idx[i]
+        l = lengths[i]
+        dst = out[s:s + l]
+        src = flat_samples[offsets[i]:offsets[i] + l]
+        v = velocities[i]
+        if sparse:
+            first_touch = s >= high_water
+            high_water = max(high_water, s + l)
+            if first_touch:
+                for j in range(l):
+                    dst[j] = src[j] * v
+                continue
+        for j in range(l):
+            dst[j] += src[j] * v
+
+
+# Add flat_samples[offsets[i]:offsets[i] + lengths[i]] * velocities[i] into out at start_idx[i], for every note i.
+# Notes must come sorted by start_idx. With sparse set, notes starting past the end of every earlier note
+# (the high water mark) are stored instead of added, so the zeroed destination isn't read.
+_mix = njit(nogil=True, fastmath=True, cache=True)(_mix_loop) if njit is not None else _mix_numpy
+
+_NOTES_PER_WORKER = 512 # scores with fewer notes per worker are mixed on the calling thread
+
+
+def _mix_parallel(out: np.ndarray, flat_samples: np.ndarray, offsets: np.ndarray, lengths: np.ndarray, start_idx: np.ndarray, velocities: np.ndarray,
+                  sparse: bool, workers: int, shard_pool: list):
+    # Same as _mix, with notes split into runs by start time that are mixed on separate threads.
+    # Each run is mixed into its own buffer spanning only the samples it touches, then the buffers are summed into out.
+    # shard_pool keeps a buffer per run, grown as needed and reused across calls.
+    ends = start_idx + lengths
+    bounds = np.linspace(0, start_idx.shape[0], workers + 1).astype(np.int64).tolist()
+    while len(shard_pool) < workers:
+        shard_pool.append(np.empty(0, dtype=out.dtype))
+
+    def mix_shard(i, lo, hi):
+        first, last = int(start_idx[lo:hi].min()), int(ends[lo:hi].max())
+        size = last - first
+        buf = shard_pool[i]
+        if buf.shape[0] < size:
+            buf = shard_pool[i] = np.empty(size, dtype=out.dtype)
+        buf = buf[:size]
+        buf.fill(0)
+        _mix(buf, flat_samples, offsets[lo:hi], lengths[lo:hi], start_idx[lo:hi] - first, velocities[lo:hi], sparse)
+        return first, buf
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        shards = list(executor.map(mix_shard, range(workers), bounds[:-1], bounds[1:]))
+    for first, buf in shards:
+        out[first:first + buf.shape[0]] += buf
+
+
 class Timeline:
-    def __init__(self, tracks: List[Track] = [], notes: List[Note] = [], keep_sorted: bool = True, sr: int = 44100, bpm: int = 120):
+    def __init__(self, tracks: List[Track] = None, notes: List[Note] = None, keep_sorted: bool = True, sr: int = 44100, bpm: int = 120, sparse_mixing: bool = True, max_workers: int = None):
         """Create a timeline for an audio composition.
+
+        Notes are compiled into arrays when they are added. After editing a note already in the timeline, call invalidate_notes().
         
         Parameters:
             tracks: A list of tracks for the timeline.
@@ -211,18 +439,38 @@ class Timeline:
             keep_sorted: If True, the notes will be sorted by start time when they are added to the timeline. If False, the notes will be stored in the order they are added.
             sr: The sample rate to use for the audio data (in samples per second).
             bpm: The beats per minute for the audio composition.
+            sparse_mixing: If True, notes that don't overlap earlier ones are written to the output instead of added to it.
+            max_workers: The most threads used to mix large scores. Defaults to the number of CPUs.
         """
         # if keep_sorted than notes will be inserted into its' proper place
         # otherwise notes will get sorted on demand
         # when keep_sorted on complexity of adding notes is O(log(n))
         self.tracks = {}
+        self._next_track_id = 0 # smallest id above every track id in use
         self.notes = []
+        self._start_times = [] # start times parallel to self.notes, used as bisect keys
+        self._soa_dirty = True # notes compiled into arrays by _rebuild_soa
+        self._st = np.empty(0, dtype=np.float64)
+        self._dur = np.empty(0, dtype=np.float64)
+        self._vel = np.empty(0, dtype=np.float32)
+        self._tid = np.empty(0, dtype=np.int32)
+        self._key = np.empty(0, dtype=object)
+        self._tw = np.empty(0, dtype=bool)
+        self._end = np.empty(0, dtype=np.float64)
+        self._end_max = np.empty(0, dtype=np.float64)
+        self._slot_start = np.empty(0, dtype=np.int64)
+        self._slot_len = np.empty(0, dtype=np.int64)
+        self._out_pool = {} # output buffers reused across renders, keyed by length
+        self._shard_pool = [] # per thread buffers reused by _mix_parallel
+        self._arena = None # sounds used by the notes, packed by finalize
         self.keep_sorted = keep_sorted
         self.sr = sr
         self.bpm = bpm
+        self.sparse_mixing = sparse_mixing
+        self.max_workers = max_workers
 
-        self.populate_tracks(tracks)
-        self.populate_notes(notes)
+        self.populate_tracks(tracks or [])
+        self.populate_notes(notes or [])
 
     @classmethod
     def from_generators(cls, sound_generators):
@@ -241,6 +489,7 @@ class Timeline:
             if track.id in self.tracks:
                 raise Warning(f'Track ID collision, track with id {track.id} already inside timeline. I\'m overwriting this track.')   
             self.tracks[track.id] = track
+            self._next_track_id = max(self._next_track_id, track.id + 1)
         
     def add_track(self, instrument: Union[Instrument, SoundGenerator], name: str = None) -> int:
         """Add new track to the timeline with non colliding id
@@ -251,9 +500,8 @@ class Timeline:
         Returns:
             track: Created track
         """
-        t_id = len(self.tracks)
-        while t_id in self.tracks:
-            t_id += 1 
+        t_id = self._next_track_id
+        self._next_track_id += 1
         
         if isinstance(instrument, SoundGenerator):
             instrument = Instrument(Wavetable(instrument))
@@ -269,11 +517,11 @@ class Timeline:
         Parameters:
             notes: The notes to add to the timeline.
         """
+        self.notes.extend(notes)
+        self._start_times.extend(note.start_time for note in notes)
+        self._soa_dirty = True
         if self.keep_sorted:
-            for note in notes:
-                bisect.insort(self.notes, note, key=lambda x: x.start_time)
-        else:
-            self.notes.extend(notes)
+            self.sort_notes()
     
     def add_note(self, note: Note):
         """Add a single note to the timeline.
@@ -282,13 +530,78 @@ class Timeline:
             note: The note to add to the timeline.
         """
         if self.keep_sorted:
-            bisect.insort(self.notes, note, key=lambda x: x.start_time)
+            i = bisect.bisect_right(self._start_times, note.start_time)
+            self._start_times.insert(i, note.start_time)
+            self.notes.insert(i, note)
         else:
             self.notes.append(note)
+            self._start_times.append(note.start_time)
+        self._soa_dirty = True
     
     def sort_notes(self):
         """Sort the notes in the timeline by start time."""
         self.notes.sort(key=lambda x: x.start_time)
+        self._start_times = [note.start_time for note in self.notes]
+        self._soa_dirty = True
+
+    def invalidate_notes(self):
+        """Recompile the notes on the next render. Call this after editing notes that are already in the timeline."""
+        if self.keep_sorted:
+            self.sort_notes()
+        else:
+            self._soa_dirty = True
+
+    def _rebuild_soa(self):
+        """Compile the notes into per-attribute arrays used by generate_audio."""
+        notes = self.notes
+        count = len(notes)
+        self._st = np.array(self._start_times, dtype=np.float64)
+        self._dur = np.fromiter((note.duration for note in notes), dtype=np.float64, count=count)
+        self._vel = np.fromiter((note.velocity for note in notes), dtype=np.float32, count=count)
+        self._tid = np.fromiter((note.track_id for note in notes), dtype=np.int32, count=count)
+        self._key = np.array([note.note for note in notes], dtype=object)
+        self._tw = np.fromiter((note.time_wise for note in notes), dtype=bool, count=count)
+        self._end = self._st + self._dur
+        # Notes are sorted by start, not by end, so bisecting needs the running maximum of end times.
+        self._end_max = np.maximum.accumulate(self._end)
+        self._soa_dirty = False
+
+        if self._arena is not None:
+            if all(pair in self._arena for pair in zip(self._tid.tolist(), self._key)):
+                self._index_arena()
+            else:
+                self._arena = None
+
+    def _index_arena(self):
+        """Look up the arena slot of every note, as start and length arrays."""
+        slots = [self._arena.slots[pair] for pair in zip(self._tid.tolist(), self._key)]
+        self._slot_start = np.fromiter((slot.start for slot in slots), dtype=np.int64, count=len(slots))
+        self._slot_len = np.fromiter((slot.stop - slot.start for slot in slots), dtype=np.int64, count=len(slots))
+
+    def prerender_wavetables(self) -> dict:
+        """Render the sound of every distinct (track, note) pair used by the notes into its wavetable.
+        
+        Per note transformations in the wavetables then run once per distinct note rather than during mixing.
+
+        Returns:
+            A dict mapping each (track id, note) pair to its rendered sound.
+        """
+        if self._soa_dirty:
+            if not self.keep_sorted:
+                self.sort_notes()
+            self._rebuild_soa()
+
+        tracks = self.tracks
+        pairs = dict.fromkeys(zip(self._tid.tolist(), self._key))
+        return {(t_id, k): tracks[t_id].instrument.wavetable[k] for t_id, k in pairs}
+
+    def finalize(self):
+        """Pack the sounds used by the notes into a single WavetableArena.
+        
+        generate_audio calls this when notes use sounds that are not packed yet. Call it again after changing an instrument's sounds.
+        """
+        self._arena = WavetableArena(self.prerender_wavetables())
+        self._index_arena()
     
     def generate_audio(self, start_time: int = 0, end_time: int = None) -> np.ndarray:
         """Generate audio data for the timeline.
@@ -296,41 +609,74 @@ class Timeline:
         Parameters:
             start_time: The start time of the audio data in bar time.
             end_time: The end time of the audio data in bar time. If not specified, the end time will be the end of the last note in the timeline.
+
+        Notes are read as they were when added. Edits made to them afterwards are only rendered after invalidate_notes().
         
         Returns:
-            A NumPy array containing the audio data for the timeline.
+            A NumPy array containing the audio data for the timeline. The buffer is reused by the next render of the same length, so copy it if it has to be kept.
         """
         
-        if not self.keep_sorted:
-            self.sort_notes()
+        if self._soa_dirty:
+            if not self.keep_sorted:
+                self.sort_notes()
+            self._rebuild_soa()
+        if self._arena is None:
+            self.finalize()
 
         if end_time is None:
-            end_time = max([note.start_time + note.duration for note in self.notes])
-        
-        audio_data = np.zeros(int((end_time - start_time) * self.sr))
-        for note in self.notes:
-            if note.start_time + note.duration <= start_time:
-                continue
-            elif note.start_time >= end_time:
-                break
-            track = self.tracks[note.track_id]
-            sound = track.instrument.play_note(note)
-            start_idx = int((note.start_time - start_time) * self.sr)
-            end_idx = start_idx + sound.shape[0]
-            audio_data[start_idx:end_idx] += sound
-        
+            end_time = float(self._end.max())
+        
+        sr = self.sr
+        n = int((end_time - start_time) * sr)
+        audio_data = self._out_pool.get(n)
+        if audio_data is None:
+            audio_data = np.zeros(n, dtype=np.float32)
+            self._out_pool[n] = audio_data
+        else:
+            audio_data.fill(0)
+
+        lo = np.searchsorted(self._end_max, start_time, side='right')
+        hi = np.searchsorted(self._st, end_time, side='left')
+        active = lo + np.flatnonzero(self._end[lo:hi] > start_time)
+        start_idx = ((self._st[active] - start_time) * sr).astype(np.int64)
+
+        # Full length notes play their whole sound, only time-wise notes are trimmed to their duration.
+        lengths = self._slot_len[active]
+        time_wise = self._tw[active]
+        lengths[time_wise] = np.minimum(lengths[time_wise], (self._dur[active][time_wise] * sr).astype(np.int64))
+
+        # Clip every note to the rendered window, notes starting before start_time are cut from the front.
+        ends = np.minimum(start_idx + lengths, n)
+        offsets = self._slot_start[active] + np.maximum(0, -start_idx)
+        starts = np.maximum(0, start_idx)
+        audible = ends > starts
+        offsets, lengths, starts = offsets[audible], (ends - starts)[audible], starts[audible]
+        velocities = self._vel[active][audible]
+
+        workers = min(self.max_workers or os.cpu_count() or 1, starts.shape[0] // _NOTES_PER_WORKER)
+        mix_args = (audio_data, self._arena.arena, offsets, lengths, starts, velocities)
+        if workers > 1:
+            _mix_parallel(*mix_args, self.sparse_mixing, workers, self._shard_pool)
+        elif starts.shape[0]:
+            _mix(*mix_args, self.sparse_mixing)
+
         return audio_data
     
     def write_wav(self, data: np.ndarray, output_filename: str) -> None:
         """Write the audio data to a WAV file.
         
         Parameters:
-            data: The audio data to write to the file.
+            data: The audio data to write to the file. Float data in [-1, 1] is clipped and written as 16-bit PCM, integer data is written unchanged in its own format.
             output_filename: The name of the file to write the data to.
         
         Returns:
             None.
         """
+        if np.issubdtype(data.dtype, np.floating):
+            # Scale into a temporary so the caller's (possibly read-only) data is left alone
+            scaled = np.multiply(data, 32767.0, dtype=np.float32)
+            np.clip(scaled, -32767.0, 32767.0, out=scaled)
+            data = scaled.astype(np.int16)
         wavfile.write(output_filename, self.sr, data)
 
  
\ No newline at end of file
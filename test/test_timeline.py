@@ -0,0 +1,74 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import audio_composition
+from audio_composition import AudioSample, Note, Timeline
+
+
+def build_score(max_workers, sparse_mixing):
+    """A dense random score, big enough for generate_audio to shard it over 4 workers."""
+    rng = np.random.default_rng(0)
+    timeline = Timeline(sparse_mixing=sparse_mixing, max_workers=max_workers)
+    for length in (900, 2500, 6000):
+        timeline.add_track(AudioSample(rng.uniform(-1, 1, length).astype(np.float32), name=str(length)))
+
+    count = 3000
+    timeline.populate_notes([
+        Note(int(t_id), 'x', float(start), float(duration), float(velocity), time_wise=bool(time_wise))
+        for t_id, start, duration, velocity, time_wise in zip(
+            rng.integers(0, 3, count), rng.uniform(0, 4, count), rng.uniform(0.001, 0.2, count),
+            rng.uniform(0, 1, count), rng.integers(0, 2, count))
+    ])
+    return timeline
+
+
+def reference_audio(timeline, start_time=0, end_time=None):
+    """Mix the notes one by one, the way generate_audio did before it was vectorized."""
+    sr = timeline.sr
+    if end_time is None:
+        end_time = max(note.start_time + note.duration for note in timeline.notes)
+    n = int((end_time - start_time) * sr)
+    audio_data = np.zeros(n)
+    for note in timeline.notes:
+        if note.start_time + note.duration <= start_time or note.start_time >= end_time:
+            continue
+        sound = np.asarray(timeline.tracks[note.track_id].instrument.wavetable[note.note], dtype=np.float64)
+        if note.time_wise:
+            sound = sound[:int(note.duration * sr)]
+        sound = sound * note.velocity
+        start_idx = int((note.start_time - start_time) * sr)
+        if start_idx < 0:
+            sound = sound[-start_idx:]
+            start_idx = 0
+        sound = sound[:max(0, n - start_idx)]
+        audio_data[start_idx:start_idx + sound.shape[0]] += sound
+    return audio_data
+
+
+@pytest.mark.parametrize('mix', ['default', 'numpy'])
+@pytest.mark.parametrize('sparse_mixing', [True, False])
+@pytest.mark.parametrize('max_workers', [1, 4])
+@pytest.mark.parametrize('window', [(0, None), (0.75, 3.2)])
+def test_generate_audio_matches_reference(monkeypatch, mix, sparse_mixing, max_workers, window):
+    if mix == 'numpy':
+        monkeypatch.setattr(audio_composition, '_mix', audio_composition._mix_numpy)
+    parallel_calls = []
+    mix_parallel = audio_composition._mix_parallel
+    def spy(*args):
+        parallel_calls.append(args)
+        return mix_parallel(*args)
+    monkeypatch.setattr(audio_composition, '_mix_parallel', spy)
+
+    timeline = build_score(max_workers, sparse_mixing)
+    audio_data = timeline.generate_audio(*window)
+    expected = reference_audio(timeline, *window)
+
+    assert bool(parallel_calls) == (max_workers > 1)
+    assert audio_data.dtype == np.float32
+    assert audio_data.shape == expected.shape
+    np.testing.assert_allclose(audio_data, expected, atol=1e-5)